@@ -51,10 +51,6 @@ License:
     
 To-do:
 
-    - Switch from using `.endswith(".txt.gz")` to the use of a regular
-      expression to better discriminate between data files during recursive
-      file crawling.
-            
     - Catch cases where a file is missing a header, missing data, or both
       (empty).
             
@@ -66,33 +62,92 @@ To-do:
 
 # %% Standard library imports.
 import argparse
-import gzip
+import ast
+import atexit
+import copy
+import io
 import logging
-import multiprocessing
 import os
 import re
 import sys
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import wait
+from functools import lru_cache
 from functools import partial
+from itertools import islice
+from typing import BinaryIO
 from typing import Callable
+from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Optional
 from typing import Tuple
 
 # %% Third party imports.
 import netCDF4 as nc
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
+# %% Optional third party imports.
+# - The ISA-L gzip module is a faster drop-in replacement for `gzip`.
+try:
+    
+    from isal import igzip as gzip
+    
+except ImportError:
+    
+    import gzip
+
+# - rapidgzip decompresses a single gzip file with multiple threads.
+try:
+    
+    import rapidgzip
+    
+except ImportError:
+    
+    rapidgzip = None
+
+# - pyarrow parses the data with multiple threads.
+try:
+    
+    import pyarrow
+    
+except ImportError:
+    
+    pyarrow = None
+
 # %% Dunder definitions.
 # - Versioning scheme: SemVer 2.0.0 (https://semver.org/spec/v2.0.0.html)
 __author__  = "Erick Edward Shepherd"
 __version__ = "1.3.3"
 
 # %% Constant definitions.
-PROCESSES     = 1
+PROCESSES     = (
+    len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity")
+    else os.cpu_count() or 1
+)
+BUFFER_SIZE   = 2 ** 20
+CHUNKSIZE     = 4
+COMPLEVEL     = 1
+CHUNK_LENGTH  = 2 ** 16
+CSV_ENGINE    = "c" if pyarrow is None else "pyarrow"
+FILL_VALUE    = -9999.0
 HEADER_REGEX  = re.compile(r"(?P<field>\S+)\s+=\s+(?P<value>.+)")
+DATA_SUFFIXES = (".txt", ".txt.gz")
+TXT_DIR_REGEX = re.compile(r"(?:\\|/)txt(?:\\|/)?")
 LOGGER_FORMAT = "%(asctime)-19s || %(levelname)-8s || %(name)s :: %(message)s"
 LOG_FILENAME  = f"{os.path.basename(__file__)}.log"
+EXECUTORS     = {}
+
+# %% Progress bar configuration.
+# - The worker processes are forked while progress bars are open, so the
+#   background thread which `tqdm` otherwise starts to monitor them is
+#   disabled to keep the forking process single threaded.
+tqdm.monitor_interval = 0
 
 # %% Logging configuration.
 # - This conditional protects an overridden logging configuration.
@@ -105,91 +160,353 @@ if __name__ not in ["__main__", "__mp_main__"]:
     )
 
 
-# %% Function definition: read_cosmic_ascii_file
-def read_cosmic_ascii_file(filename : str) -> Tuple[dict, dict, bool]:
+# %% Function definition: _parse_literal
+@lru_cache(maxsize = 1024)
+def _parse_literal(value : str):
     
     '''
     
-    Given the name of or path to a COSMIC ASCII file, this function reads data
-    from the file into a `dict` of header fields and a `dict` of
-    `pandas.DataFrame`s and returns both `dict` objects.
+    Parses a header value string as a Python literal. If the value is not a
+    valid literal, it is returned as a stripped string. The results are
+    cached, so they are shared between calls; use `_parse_value` instead,
+    which returns a copy of them.
     
-    :param filename: The filename of or path to the data file.
-    :type filename: str
+    :param value: The header value string.
+    :type value: str
     
-    :return: The data file header, data, and whether the file is empty.
-    :rtype: Tuple[dict, dict, bool]
+    :return: The parsed header value.
     
     '''
     
-    logger = logging.getLogger("read_cosmic_ascii_file")
+    value = value.strip()
+    
+    # Numbers are the most common values and are converted directly,
+    # without building a syntax tree. Values with a leading zero, which
+    # are not valid integer literals, and values ending in a letter, such
+    # as "-inf", are left to `ast.literal_eval`.
+    digits = value.lstrip("+-")
+    
+    if digits[:1] in tuple(".123456789") and not value[-1:].isalpha():
+        
+        for number_type in (int, float):
+            
+            try:
+                
+                return number_type(value)
+                
+            except ValueError:
+                
+                pass
+    
+    try:
+        
+        return ast.literal_eval(value)
+        
+    except (ValueError, SyntaxError):
+        
+        return value
+
+
+# %% Function definition: _parse_value
+def _parse_value(value : str):
+    
+    '''
+    
+    Parses a header value string as a Python literal. If the value is not a
+    valid literal, it is returned as a stripped string.
+    
+    COSMIC files share a fixed schema, so most header values (the data type
+    names, IDs, and fields) repeat from file to file. Parsed values are cached
+    so that each distinct value is only parsed once per process. Each call
+    returns its own copy of the cached value, so that modifying a header does
+    not change the headers of the files parsed after it.
+    
+    :param value: The header value string.
+    :type value: str
     
-    header     = {}
-    body_index = None
+    :return: The parsed header value.
+    
+    '''
+    
+    return copy.deepcopy(_parse_literal(value))
+
+
+# %% Function definition: _open_binary_file
+def _open_binary_file(filename : str,
+                      threads  : int = 1) -> BinaryIO:
+    
+    '''
+    
+    Opens a plain or gzip-compressed file for binary reading. Plain files are
+    read through a large read buffer. Gzip-compressed files are decompressed
+    into memory in a single call, which is faster than decompressing them
+    through a stream. If more than one thread is given and `rapidgzip` is
+    installed, gzip-compressed files are decompressed in parallel instead.
+    
+    :param filename: The filename of or path to the file.
+    :type filename: str
+    
+    :param threads: The number of threads to decompress the file with.
+    :type threads: int
+    
+    :return: A binary stream of the file contents.
+    :rtype: BinaryIO
+    
+    '''
     
     if filename.endswith(".gz"):
         
-        open_file = partial(gzip.open, mode = "rt")
+        if threads > 1 and rapidgzip is not None:
+            
+            return rapidgzip.open(filename, parallelization = threads)
         
-    else:
+        with open(filename, "rb") as file:
+            
+            return io.BytesIO(gzip.decompress(file.read()))
+    
+    return open(filename, "rb", buffering = BUFFER_SIZE)
+
+
+# %% Function definition: _split_header_line
+def _split_header_line(line : str) -> Optional[Tuple[str, str]]:
+    
+    '''
+    
+    Splits a header line of the form "FIELD = value" into its field and value.
+    Well-formed lines are split without the use of a regular expression, while
+    any other line falls back to `HEADER_REGEX`.
+    
+    :param line: The line to split.
+    :type line: str
+    
+    :return: The field and value, or `None` if the line is not a header line.
+    :rtype: Optional[Tuple[str, str]]
+    
+    '''
+    
+    field, separator, value = line.partition(" = ")
+    
+    if separator and value.strip() and field.split() == [field]:
         
-        open_file = partial(open, mode = "r")
+        return field, value
+    
+    match = HEADER_REGEX.match(line)
     
-    with open_file(filename) as file:
+    if match:
         
-        for index, line in enumerate(file):
+        return match["field"], match["value"]
+    
+    return None
+
+
+# %% Function definition: _read_header
+def _read_header(file : BinaryIO) -> Tuple[dict, int]:
+    
+    '''
+    
+    Reads the header of a COSMIC ASCII file line by line and stops at the
+    first line which is not a header field. Only the header lines are decoded,
+    as pandas parses the body from bytes.
+    
+    :param file: A binary stream of the file contents, positioned at its start.
+    :type file: BinaryIO
+    
+    :return: The file header and the byte offset at which the body starts.
+    :rtype: Tuple[dict, int]
+    
+    '''
+    
+    header      = {}
+    body_offset = 0
+    
+    for line in file:
+        
+        # Blank lines are skipped so that they do not end the header.
+        if not line.strip():
             
-            match = HEADER_REGEX.match(line)
+            body_offset += len(line)
             
-            if match:
-                
-                field = match["field"]
-                value = match["value"]
-                
-                # Attempt to evaluate the "value" string. If the evaluation
-                # fails, treat "value" as a string.
-                try:
-                
-                    header[field] = eval(value)
-                    
-                except (NameError, SyntaxError):
-                    
-                    header[field] = eval(f"'{value}'")
-                
-                # If "value" evaluates as a set, order of the elements risks
-                # being lost. To preserve element order, this modifies the
-                # string so that it evaluates instead as a tuple.
-                #
-                # NOTE: This will not preserve the order of any nested sets
-                #       caught in the evaluation, but such generality is not
-                #       believed to be necessary at this time.
-                if isinstance(header[field], set):
-                    
-                    value = f"({value.strip()[1:-1]},)"
-                    
-                    header[field] = eval(value)
-                    
-                body_index = index + 1
+            continue
+        
+        header_line = _split_header_line(line.decode())
+        
+        if header_line is None:
+            
+            break
+        
+        field, value = header_line
+        value        = value.strip()
+        parsed       = None
+        
+        # If "value" is written as a set, order of the elements risks
+        # being lost. To preserve element order, the braces are
+        # rewritten before parsing so that it evaluates as a tuple.
+        # Anything else in braces, such as a dictionary, fails to parse
+        # as a tuple and is parsed as written below.
+        #
+        # NOTE: This will not preserve the order of any nested sets
+        #       caught in the evaluation, but such generality is not
+        #       believed to be necessary at this time.
+        if value.startswith("{") and value.endswith("}"):
+            
+            parsed = _parse_value(f"({value[1:-1]},)")
+        
+        # Attempt to parse the "value" string as a literal. If the
+        # parsing fails, "value" is treated as a string.
+        if not isinstance(parsed, tuple):
+            
+            parsed = _parse_value(value)
+        
+        header[field] = parsed
+        
+        body_offset += len(line)
+    
+    return header, body_offset
+
+
+# %% Function definition: _run_starts
+def _run_starts(array : np.ndarray) -> np.ndarray:
+    
+    '''
+    
+    Returns the index of the first element of each run of equal elements in
+    a non-empty 1-D array.
+    
+    :param array: The array.
+    :type array: numpy.ndarray
+    
+    :return: The index at which each run starts.
+    :rtype: numpy.ndarray
+    
+    '''
+    
+    return np.concatenate(([0], np.flatnonzero(array[1:] != array[:-1]) + 1))
+
+
+# %% Function definition: _parse_schema
+@lru_cache(maxsize = 64)
+def _parse_schema(
+        dtype_names  : tuple,
+        dtype_ids    : tuple,
+        dtype_fields : tuple,
+        float32      : bool = False) -> Tuple[dict, list, dict]:
+    
+    '''
+    
+    Given the data type names, IDs, and fields of a COSMIC ASCII file header,
+    this function describes each data type and the columns of the file body.
+    Files which share a schema share the cached result, which must not be
+    modified.
+    
+    :param dtype_names: The name of each data type.
+    :type dtype_names: tuple
+    
+    :param dtype_ids: The ID of each data type.
+    :type dtype_ids: tuple
+    
+    :param dtype_fields: The field names of each data type.
+    :type dtype_fields: tuple
+    
+    :param float32: Whether to read the data as single precision floats.
+    :type float32: bool
+    
+    :return: The ID and fields of each data type, and the name and data type
+        of each column of the file body.
+    :rtype: Tuple[dict, list, dict]
+    
+    '''
     
     data_types = {}
     
-    for index, dtype_name in enumerate(header["DataTypeName"]):
+    for dtype_name, dtype_id, fields in zip(
+            dtype_names, dtype_ids, dtype_fields):
         
         data_types[dtype_name] = {}
         
-        dtype_id     = header["DataTypeID"][index]
-        dtype_fields = header[f"Fields({dtype_id})"]
-        
         data_types[dtype_name]["id"]     = dtype_id
-        data_types[dtype_name]["fields"] = dtype_fields
-        
-    raw_data = pd.read_csv(
-        filename,
-        sep       = "\t",
-        names     = ["Field", *data_types[dtype_name]["fields"]],
-        na_values = -9999.0,
-        skiprows  = body_index
-    )
+        data_types[dtype_name]["fields"] = fields
+    
+    names = ["Field", *data_types[dtype_name]["fields"]]
+    
+    # The body is parsed with explicit data types so that pandas does not
+    # need to infer the type of each column. Single precision halves the
+    # memory and netCDF4 file size, but only preserves ~7 significant digits.
+    dtypes = dict.fromkeys(names, "float32" if float32 else "float64")
+    dtypes["Field"] = "float64"
+    
+    return data_types, names, dtypes
+
+
+# %% Function definition: read_cosmic_ascii_file
+def read_cosmic_ascii_file(
+        filename : str,
+        float32  : bool = False,
+        threads  : int  = 1,
+) -> Tuple[dict, Optional[Dict[str, Dict[str, np.ndarray]]], bool]:
+    
+    '''
+    
+    Given the name of or path to a COSMIC ASCII file, this function reads data
+    from the file into a `dict` of header fields and a `dict` mapping each data
+    type name to a `dict` of its columns as 1-D `numpy.ndarray`s, and returns
+    both `dict` objects.
+    
+    :param filename: The filename of or path to the data file.
+    :type filename: str
+    
+    :param float32: Whether to read the data as single precision floats.
+    :type float32: bool
+    
+    :param threads: The number of threads to decompress the file with.
+    :type threads: int
+    
+    :return: The data file header, data, and whether the file is empty.
+    :rtype: Tuple[dict, Optional[Dict[str, Dict[str, np.ndarray]]], bool]
+    
+    '''
+    
+    logger = logging.getLogger("read_cosmic_ascii_file")
+    
+    with _open_binary_file(filename, threads) as file:
+        
+        # The body is handed to pandas from the same stream as the header, so
+        # the file is only read and decompressed once and is never copied.
+        header, body_offset = _read_header(file)
+        
+        dtype_ids = tuple(header["DataTypeID"])
+        
+        data_types, names, dtypes = _parse_schema(
+            tuple(header["DataTypeName"]),
+            dtype_ids,
+            tuple(tuple(header[f"Fields({i})"]) for i in dtype_ids),
+            float32,
+        )
+        
+        read_body = partial(
+            pd.read_csv,
+            sep   = "\t",
+            names = names,
+            dtype = dtypes,
+        )
+        
+        # A well-formed body is a dense matrix of numbers, so it is parsed
+        # without pandas' per-token missing value detection, with pyarrow if
+        # it is installed, and the fill values are then replaced in a single
+        # vectorized pass. Empty, ragged, or otherwise malformed bodies fail
+        # this fast path and are parsed by the C parser with missing value
+        # detection.
+        try:
+            
+            file.seek(body_offset)
+            
+            raw_data = read_body(file, engine = CSV_ENGINE, na_filter = False)
+            raw_data = raw_data.replace(FILL_VALUE, np.nan)
+            
+        except ValueError:
+            
+            file.seek(body_offset)
+            
+            raw_data = read_body(file, engine = "c", na_values = FILL_VALUE)
     
     file_is_empty = raw_data.empty
     
@@ -202,23 +519,61 @@ def read_cosmic_ascii_file(filename : str) -> Tuple[dict, dict, bool]:
     else:
     
         data = {}
+        
+        # The values are kept in column-major (Fortran) order so that each
+        # column is contiguous in memory. pandas usually stores the columns
+        # this way already, in which case no copy is made.
+        field  = raw_data["Field"].to_numpy()
+        values = np.asfortranarray(raw_data.drop(columns = "Field").to_numpy())
+        
+        starts = _run_starts(field)
+        
+        # COSMIC files usually list the rows of each data type contiguously.
+        # Otherwise, the rows are stably sorted by their data type ID in a
+        # single pass, which makes each data type contiguous while keeping
+        # its rows in their original order. The rows are gathered through
+        # the transpose, so that the columns stay contiguous.
+        if np.unique(field[starts]).size != starts.size:
+            
+            order  = np.argsort(field, kind = "stable")
+            field  = field[order]
+            values = np.take(values.T, order, axis = 1).T
+            starts = _run_starts(field)
+        
+        ends = np.append(starts[1:], field.size)
+        
+        # Each data type is a slice of the rows.
+        groups = {
+            field[start] : slice(start, end)
+            for start, end in zip(starts, ends)
+        }
+        
+        # Data types without any rows are given empty arrays.
+        empty = slice(0, 0)
 
+        # Each data type is stored as a `dict` of 1-D column arrays. A slice
+        # of a column of `values` is a contiguous view rather than a copy, so
+        # netCDF4 writes it without first gathering its elements.
         for name in data_types.keys():
 
             dtype_id     = data_types[name]["id"]
             dtype_fields = data_types[name]["fields"]
+            rows         = groups.get(dtype_id, empty)
 
-            data[name] = raw_data[raw_data["Field"] == dtype_id]
-            data[name] = data[name].drop(["Field"], axis = 1)
-            data[name] = data[name].reset_index(drop = True)
-            data[name].columns = dtype_fields
-            data[name].index.name = "Index"
+            data[name] = {
+                column : values[rows, index]
+                for index, column in enumerate(dtype_fields)
+            }
     
     return header, data, file_is_empty
 
 
 # %% Function definition: write_cosmic_netcdf4_file
-def write_cosmic_netcdf4_file(filename : str, header : dict, data : dict):
+def write_cosmic_netcdf4_file(
+        filename  : str,
+        header    : dict,
+        data      : Optional[Dict[str, Dict[str, np.ndarray]]],
+        complevel : int = COMPLEVEL):
     
     '''
     
@@ -231,8 +586,12 @@ def write_cosmic_netcdf4_file(filename : str, header : dict, data : dict):
     :param header: The ASCII file header containing metadata about the dataset.
     :type header: dict
     
-    :param data: A `dict` of `pandas.DataFrame` objects of the file data.
-    :type data: dict
+    :param data: A `dict` of `dict`s of 1-D `numpy.ndarray` columns of the file
+                 data, or `None` if the file is empty.
+    :type data: Optional[Dict[str, Dict[str, np.ndarray]]]
+    
+    :param complevel: The zlib compression level, where 0 disables compression.
+    :type complevel: int
     
     '''
     
@@ -244,34 +603,60 @@ def write_cosmic_netcdf4_file(filename : str, header : dict, data : dict):
         base_filename = os.path.splitext(base_filename)[0]
     
     save_filename = base_filename + ".nc"
-    save_filename = re.sub(r"(?:\\|/)txt(?:\\|/)?", "/nc/", save_filename)
+    save_filename = TXT_DIR_REGEX.sub("/nc/", save_filename)
+    
+    # The "nc" directory is created beside the "txt" directory on demand.
+    os.makedirs(os.path.dirname(save_filename), exist_ok = True)
     
     with nc.Dataset(save_filename, "w") as dataset:
         
-        for key, value in header.items():
-        
-            dataset.setncattr(key, value)
+        dataset.setncatts(header)
         
         if data is not None:
         
-            for group_name, df in data.items():
-
+            for group_name, columns in data.items():
+                
+                size = len(next(iter(columns.values()), ()))
+                
                 group = dataset.createGroup(group_name)
-                group.createDimension(df.index.name, df.index.size)
+                group.createDimension("Index", size)
+                
+                # Compressed variables are stored in chunks of up to
+                # `CHUNK_LENGTH` values, which fit in the HDF5 chunk cache,
+                # while uncompressed variables are stored contiguously. Empty
+                # dimensions are unlimited and keep the default chunking.
+                contiguous = bool(size) and not complevel
+                chunksizes = (
+                    (min(size, CHUNK_LENGTH),) if size and complevel else None
+                )
 
-                for column in df.columns:
+                # Each variable is written in full, so it is not prefilled
+                # with fill values.
+                for column, values in columns.items():
 
                     variable = group.createVariable(
                         column,
-                        df[column].dtype.str,
-                        (df.index.name,)
+                        values.dtype.str,
+                        ("Index",),
+                        zlib       = complevel > 0,
+                        complevel  = complevel,
+                        shuffle    = complevel > 0,
+                        contiguous = contiguous,
+                        chunksizes = chunksizes,
+                        endian     = "native",
+                        fill_value = False,
                     )
-
-                    variable[:] = df[column].values
+                    
+                    variable.set_auto_mask(False)
+                    variable[:] = values
     
 
 # %% Function definition: convert_cosmic_file
-def convert_cosmic_file(filename : str, skip_empty : bool = False) -> int:
+def convert_cosmic_file(filename   : str,
+                        skip_empty : bool = False,
+                        float32    : bool = False,
+                        threads    : int  = 1,
+                        complevel  : int  = COMPLEVEL) -> int:
     
     '''
     
@@ -284,6 +669,15 @@ def convert_cosmic_file(filename : str, skip_empty : bool = False) -> int:
     :param skip_empty: Whether skip conversion of files whose arrays are empty.
     :type skip_empty: bool
     
+    :param float32: Whether to store the data as single precision floats.
+    :type float32: bool
+    
+    :param threads: The number of threads to decompress the file with.
+    :type threads: int
+    
+    :param complevel: The zlib compression level, where 0 disables compression.
+    :type complevel: int
+    
     :return: An integer completion code. 0: converted, 1: skipped, 2: error.
     :rtype: int
     
@@ -299,7 +693,11 @@ def convert_cosmic_file(filename : str, skip_empty : bool = False) -> int:
     
     try:
 
-        header, data, file_is_empty = read_cosmic_ascii_file(filename)
+        header, data, file_is_empty = read_cosmic_ascii_file(
+            filename,
+            float32,
+            threads,
+        )
         
         if file_is_empty:
             
@@ -314,13 +712,13 @@ def convert_cosmic_file(filename : str, skip_empty : bool = False) -> int:
             
             else:
                 
-                write_cosmic_netcdf4_file(filename, header, data)
+                write_cosmic_netcdf4_file(filename, header, data, complevel)
                 
                 return completion_codes["converted"]
                 
         else:
             
-            write_cosmic_netcdf4_file(filename, header, data)
+            write_cosmic_netcdf4_file(filename, header, data, complevel)
             
             return completion_codes["converted"]
         
@@ -336,6 +734,195 @@ def convert_cosmic_file(filename : str, skip_empty : bool = False) -> int:
         return completion_codes["error"]
 
 
+# %% Function definition: _iter_data_files
+def _iter_data_files(paths : Iterable) -> Iterator[str]:
+    
+    '''
+    
+    Yields the COSMIC ASCII data files given directly in `paths` and those
+    found by recursively scanning the directories in `paths`.
+    
+    :param paths: The paths to COSMIC ASCII files or directories of them.
+    :type paths: Iterable
+    
+    :return: The absolute paths to the COSMIC ASCII data files.
+    :rtype: Iterator[str]
+    
+    '''
+    
+    for path in paths:
+    
+        path = os.path.abspath(path)
+
+        if not os.path.isfile(path):
+
+            yield from _scan_data_files(path)
+
+        else:
+
+            yield path
+
+
+# %% Function definition: _prefetch_files
+def _prefetch_files(paths : Iterable) -> Iterable[str]:
+    
+    '''
+    
+    Yields each path in turn after advising the kernel that the file will be
+    read soon. Files are then read from disk in the background while the
+    files ahead of them are still being converted.
+    
+    :param paths: The paths of the files to prefetch.
+    :type paths: Iterable
+    
+    :return: The given paths.
+    :rtype: Iterable[str]
+    
+    '''
+    
+    for path in paths:
+        
+        if hasattr(os, "posix_fadvise"):
+            
+            try:
+                
+                fd = os.open(path, os.O_RDONLY)
+                
+                try:
+                    
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                    
+                finally:
+                    
+                    os.close(fd)
+                    
+            except OSError:
+                
+                pass
+        
+        yield path
+
+
+# %% Function definition: _scan_data_files
+def _scan_data_files(directory : str) -> Iterator[str]:
+    
+    '''
+    
+    Recursively scans a directory for COSMIC ASCII data files. Directories
+    which cannot be read, such as those without read permission, are logged
+    and skipped.
+    
+    :param directory: The path to the directory to scan.
+    :type directory: str
+    
+    :return: The paths to the COSMIC ASCII data files.
+    :rtype: Iterator[str]
+    
+    '''
+    
+    logger = logging.getLogger("_scan_data_files")
+    
+    try:
+        
+        entries = os.scandir(directory)
+        
+    except OSError as error:
+        
+        logger.warning(
+            f"The following directory could not be scanned: {directory}. "
+            f"{error}"
+        )
+        
+        return
+    
+    with entries:
+        
+        for entry in entries:
+            
+            # Symbolic links to directories are not followed.
+            if entry.is_dir():
+                
+                if not entry.is_symlink():
+                    
+                    yield from _scan_data_files(entry.path)
+                    
+            elif entry.name.endswith(DATA_SUFFIXES):
+                
+                yield entry.path
+
+
+# %% Function definition: _init_worker
+def _init_worker(threads : int) -> None:
+    
+    '''
+    
+    Initializes a worker process of the process pool. The pyarrow parser of
+    each worker uses its share of the CPUs, rather than all of them.
+    
+    :param threads: The number of threads each worker parses files with.
+    :type threads: int
+    
+    '''
+    
+    if pyarrow is not None:
+        
+        pyarrow.set_cpu_count(threads)
+
+
+# %% Function definition: _get_executor
+def _get_executor(processes : int) -> ProcessPoolExecutor:
+    
+    '''
+    
+    Returns a process pool with the given number of workers. The pool is
+    created on first use and reused by later calls, so that the worker
+    processes are only started once per program invocation.
+    
+    :param processes: The number of pool processes to use for worker creation.
+    :type processes: int
+    
+    :return: The process pool.
+    :rtype: ProcessPoolExecutor
+    
+    '''
+    
+    if processes not in EXECUTORS:
+        
+        # CPUs which are not used by a worker process are shared among the
+        # workers to parse each file with multiple threads.
+        EXECUTORS[processes] = ProcessPoolExecutor(
+            processes,
+            initializer = _init_worker,
+            initargs    = (max(1, PROCESSES // processes),),
+        )
+        
+        atexit.register(EXECUTORS[processes].shutdown)
+    
+    return EXECUTORS[processes]
+
+
+# %% Function definition: _apply_chunk
+def _apply_chunk(function : Callable, chunk : list) -> list:
+    
+    '''
+    
+    Applies a function to each element of a chunk of its domain, so that a
+    worker process handles the whole chunk in a single task.
+    
+    :param function: The function to apply.
+    :type function: Callable
+    
+    :param chunk: The elements of the domain to apply the function to.
+    :type chunk: list
+    
+    :return: A list of the return values of the function.
+    :rtype: list
+    
+    '''
+    
+    return [function(element) for element in chunk]
+
+
 # %% Function definition: parallelize
 def parallelize(
         function  : Callable,
@@ -343,7 +930,8 @@ def parallelize(
         desc      : str  = None,
         processes : int  = PROCESSES,
         verbose   : bool = True,
-        total     : int  = None) -> list:
+        total     : int  = None,
+        chunksize : int  = None) -> list:
     
     '''
     
@@ -364,38 +952,68 @@ def parallelize(
     :param verbose: Whether to print the `tqdm` progress bar.
     :type verbose: bool
     
-    :param total: The total number of iterations expected.
+    :param total: The total number of iterations expected. If not given, it
+        is the length of the domain, if the domain has one.
     :type total: int
     
+    :param chunksize: The number of elements sent to a worker in each task. If
+        not given, it is derived from the total, if there is one.
+    :type chunksize: int
+    
     :return: A list of collected return values from the paralleized function.
+        The return values are in order of completion, not of the domain.
     :rtype: list
     
     '''
     
     # If not explicitly given, this computes the total from the length of the
-    # domain.
-    if total is None:
+    # domain. Domains without a length, such as generators, have no total.
+    if total is None and hasattr(domain, "__len__"):
         
         total = len(domain)
     
     if processes > 1:
-    
-        # Instantiates the multiprocessing pool.
-        with multiprocessing.Pool(processes) as pool:
-
-            # Deterines whether or not to wrap the Pool.imap with a tqdm
-            # progress bar.
-            if verbose:
-
-                results = list(tqdm(
-                    pool.imap(function, domain),
-                    total = total,
-                    desc = desc
-                ))
-
-            else:
-
-                results = list(pool.imap(function, domain))
+        
+        results = []
+        pending = set()
+        
+        executor = _get_executor(processes)
+        
+        # Sending the domain to the workers in chunks amortizes the cost of
+        # each task's round trip. Without a given chunk size, each worker is
+        # sent about eight chunks, so that the work stays balanced.
+        if chunksize is None:
+            
+            chunksize = max(1, (total or 0) // (processes * 8))
+        
+        domain = iter(domain)
+        chunks = iter(lambda: list(islice(domain, chunksize)), [])
+        
+        # Instantiates the optional progress bar.
+        with tqdm(total = total, desc = desc, disable = not verbose) as pbar:
+            
+            # The domain is consumed lazily, so that no more than two chunks
+            # per worker are queued at any time.
+            for chunk in chunks:
+                
+                pending.add(executor.submit(_apply_chunk, function, chunk))
+                
+                if len(pending) >= 2 * processes:
+                    
+                    done, pending = wait(
+                        pending,
+                        return_when = FIRST_COMPLETED
+                    )
+                    
+                    for future in done:
+                        
+                        results.extend(future.result())
+                        pbar.update(len(future.result()))
+            
+            for future in as_completed(pending):
+                
+                results.extend(future.result())
+                pbar.update(len(future.result()))
                 
     else:
         
@@ -419,8 +1037,10 @@ def parallelize(
 
 # %% Function definition: crawl_convert
 def crawl_convert(paths      : Iterable,
-                  processes  : int = PROCESSES,
-                  skip_empty : bool = False) -> List[int]:
+                  processes  : int  = PROCESSES,
+                  skip_empty : bool = False,
+                  float32    : bool = False,
+                  complevel  : int  = COMPLEVEL) -> List[int]:
     
     '''
     
@@ -430,66 +1050,47 @@ def crawl_convert(paths      : Iterable,
     directory, identifies each .txt.gz file, and creates a netCDF4 formatted
     copy inplace.
     
-    :param path: The paths to COSMIC ASCII files or directories of them.
-    :type path: list
+    :param paths: The paths to COSMIC ASCII files or directories of them.
+    :type paths: Iterable
     
-    :param processes: The number of multiprocessing workers to use.
+    :param processes: The number of worker processes to use.
     :type processes: int
     
     :param skip_empty: Whether skip conversion of files whose arrays are empty.
     :type skip_empty: bool
     
+    :param float32: Whether to store the data as single precision floats.
+    :type float32: bool
+    
+    :param complevel: The zlib compression level, where 0 disables compression.
+    :type complevel: int
+    
     :return: A list of integer completion codes.
     :rtype: List[int]
     
     '''
     
-    path = list(paths)
+    # CPUs which are not used by a worker process are shared among the
+    # workers to decompress each file with multiple threads.
+    threads = max(1, PROCESSES // max(1, processes))
+    
+    # The data files are converted as they are found, so that the workers
+    # start converting while the directories are still being crawled.
+    completion_codes = parallelize(
+        partial(
+            convert_cosmic_file,
+            skip_empty = skip_empty,
+            float32    = float32,
+            threads    = threads,
+            complevel  = complevel,
+        ),
+        _prefetch_files(_iter_data_files(paths)),
+        "Converting ASCII to netCDF4",
+        processes,
+        chunksize = CHUNKSIZE,
+    )
     
-    for path in paths:
-    
-        path = os.path.abspath(path)
-
-        data_paths = []
-
-        if not os.path.isfile(path):
-
-            for root, directories, files in os.walk(path):
-                
-                for directory in directories:
-                    
-                    dir_path = os.path.join(root, directory)
-                    
-                    if re.search(r"(?:\\|/)txt(?:\\|/)?", dir_path):
-                        
-                        nc_dir_path = re.sub(
-                            r"(?:\\|/)txt(?:\\|/)?",
-                            "/nc",
-                            dir_path
-                        )
-                    
-                        if not os.path.exists(nc_dir_path):
-                        
-                            os.mkdir(nc_dir_path)
-
-                for file in files:
-
-                    if file.endswith(".txt") or file.endswith(".txt.gz"):
-
-                        data_paths.append(os.path.join(root, file))
-
-        else:
-
-            data_paths.append(path)
-                
-        completion_codes = parallelize(
-            partial(convert_cosmic_file, skip_empty = skip_empty),
-            data_paths,
-            "Converting ASCII to netCDF4",
-            processes,
-        )
-        
-        return completion_codes
+    return completion_codes
     
 
 # %% Main-multiprocessing hybrid entry point.
@@ -526,11 +1127,13 @@ if __name__ in ["__main__", "__mp_main__"]:
     
     parser.add_argument(
         "--processes",
+        "--jobs",
+        dest    = "processes",
         type    = int,
         default = PROCESSES,
         help    = (
-            "The number of processes to use in the multiprocessing pool. "
-            f"Defaults to {PROCESSES}."
+            "The number of processes to use in the process pool. "
+            "Defaults to the number of CPUs available to this process."
         )
     )
     
@@ -541,7 +1144,33 @@ if __name__ in ["__main__", "__mp_main__"]:
         help   = "Skips converting files whose arrays are all empty."
     )
     
+    parser.add_argument(
+        "--float32",
+        dest   = "float32",
+        action = "store_true",
+        help   = (
+            "Stores the data as single precision floats. This halves the "
+            "size of the netCDF4 files, but only preserves about 7 "
+            "significant digits."
+        )
+    )
+    
+    parser.add_argument(
+        "--complevel",
+        dest    = "complevel",
+        type    = int,
+        choices = range(10),
+        default = COMPLEVEL,
+        metavar = "COMPLEVEL",
+        help    = (
+            "The zlib compression level (0-9) of the netCDF4 files. A level "
+            "of 0 stores the data uncompressed and contiguously, which is "
+            f"fastest to write and read. Defaults to {COMPLEVEL}."
+        )
+    )
+    
     parser.set_defaults(skip_empty = False)
+    parser.set_defaults(float32    = False)
     
     try:
     
@@ -571,12 +1200,20 @@ if __name__ in ["__main__", "__mp_main__"]:
     path       = kwargv["path"]
     processes  = kwargv["processes"]
     skip_empty = kwargv["skip_empty"]
+    float32    = kwargv["float32"]
+    complevel  = kwargv["complevel"]
     
 # %% Main entry point.
 # - Allows forking to start child processes.
 if __name__ == "__main__":
     
-    completion_codes = crawl_convert(path, processes, skip_empty)
+    completion_codes = crawl_convert(
+        path,
+        processes,
+        skip_empty,
+        float32,
+        complevel,
+    )
     
     total_conversions      = len(completion_codes)
     conversions_successful = completion_codes.count(0)
@@ -61,19 +61,31 @@ To-do:
 
 # %% Standard library imports.
 import argparse
-import multiprocessing
+import atexit
+import hashlib
+import logging
+import multiprocessing.pool
 import os
+import queue
+import random
 import requests
 import re
+import tempfile
+import threading
+import time
+from functools import partial
 from typing import Callable
 from typing import Dict
 from typing import Iterable
 from typing import List
+from typing import Optional
 
 # %% Third party imports.
 from tqdm import tqdm
 
 # %% Local application imports.
+from convert_files import COMPLEVEL
+from convert_files import LOG_FILENAME
 from convert_files import crawl_convert
 
 # %% Dunder definitions.
@@ -82,48 +94,124 @@ __version__ = "1.3.1"
 
 # %% Constant definitions.
 URL_REGEX        = r"<a href=\"(?P<url>.*?)\""
-YEAR_URL_REGEX   = r"<a href=\"(?P<url>y\d{4}/)\""
-DATE_URL_REGEX   = r"<a href=\"(?P<url>\d{4}-\d{2}-\d{2}/)\""
-DATA_URL_REGEX   = r"<a href=\"(?P<url>\S*?\.(?:txt\.gz))\""
-FORMAT_URL_REGEX = r"<a href=\"(?P<url>\w+/)\""
-FILENAME_REGEX   = (r".*(?:\\|/)+cosmic\d(?:\\|/)+postproc(?:\\|/)+"
-                    r"y(?P<year>\d{4})(?:\\|/)+(?P<dtg>\d{4}-\d{2}-\d{2})"
-                    r"(?:\\|/)+(?:L2)*(?:\\|/)+(?P<filetype>txt)(?:\\|/)+"
-                    r"(?P<filename>.*)")
+YEAR_URL_REGEX   = r"y\d{4}/"
+DATE_URL_REGEX   = r"\d{4}-\d{2}-\d{2}/"
+DATA_URL_REGEX   = r"\S*\.txt\.gz"
+FORMAT_URL_REGEX = r"\w+/"
 URL_REGEX        = re.compile(URL_REGEX,        re.MULTILINE)
-YEAR_URL_REGEX   = re.compile(YEAR_URL_REGEX,   re.MULTILINE)
-DATE_URL_REGEX   = re.compile(DATE_URL_REGEX,   re.MULTILINE)
-FORMAT_URL_REGEX = re.compile(FORMAT_URL_REGEX, re.MULTILINE)
-DATA_URL_REGEX   = re.compile(DATA_URL_REGEX,   re.MULTILINE)
-FILENAME_REGEX   = re.compile(FILENAME_REGEX,   re.DOTALL)
+YEAR_URL_REGEX   = re.compile(YEAR_URL_REGEX)
+DATE_URL_REGEX   = re.compile(DATE_URL_REGEX)
+FORMAT_URL_REGEX = re.compile(FORMAT_URL_REGEX)
+DATA_URL_REGEX   = re.compile(DATA_URL_REGEX)
 INSTRUMENT       = "cosmic"
 DATA_DIRECTORY   = "postproc"
 DATA_LEVEL       = "L2"
 BASE_URL         = "https://genesis.jpl.nasa.gov/ftp/pub/genesis/glevels"
 SAVE_DIRECTORY   = os.path.abspath("./jpl_cosmic")
-CHUNK_SIZE       = 2 ** 13
-PROCESSES        = 1
-FILES_TO_GET     = -1
+BUFFER_SIZE      = 2 ** 20
+PART_SUFFIX      = ".part"
+VALIDATOR_SUFFIX = ".validator"
+PROCESSES        = (
+    len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity")
+    else os.cpu_count() or 1
+)
+CONNECTIONS      = 16
+RETRIES          = 8
+MAX_BACKOFF      = 60
+TIMEOUT          = 60
+CACHE_TTL        = 24
+CACHE_DIRECTORY  = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "cosmic_crunch",
+    "listings"
+)
+POOLS            = {}
+SESSIONS         = threading.local()
+
+
+# %% Function definition: _get_pool
+def _get_pool(threads : int) -> multiprocessing.pool.ThreadPool:
+    
+    '''
+    
+    Returns a thread pool with the given number of workers. Crawling and
+    downloading only wait on the network, so threads serve many concurrent
+    requests without the cost of starting and pickling arguments to worker
+    processes. The pool is created on first use and reused by every later
+    crawling and download stage.
+    
+    :param threads: The number of worker threads.
+    :type threads: int
+    
+    :return: The thread pool.
+    :rtype: multiprocessing.pool.ThreadPool
+    
+    '''
+    
+    if threads not in POOLS:
+        
+        POOLS[threads] = multiprocessing.pool.ThreadPool(threads)
+        
+        atexit.register(POOLS[threads].terminate)
+    
+    return POOLS[threads]
 
 
-# %% Function definition: flatten
-def flatten(list_of_lists : List[List]) -> List:
+# %% Function definition: _close_pools
+def _close_pools() -> None:
     
     '''
     
-    # TODO
+    Terminates every cached thread pool and waits for its threads to exit.
+    This must be called before worker processes are forked, as forking a
+    process which is still running other threads can deadlock the child.
+    
+    '''
+    
+    for pool in POOLS.values():
+        
+        pool.terminate()
+        pool.join()
+    
+    POOLS.clear()
+
+
+# %% Function definition: _get_session
+def _get_session() -> requests.Session:
     
     '''
     
-    return [element for sublist in list_of_lists for element in sublist]
+    Returns the HTTP session of the calling thread. Each worker thread creates
+    its own session on first use and reuses it for every later request, so
+    that its connection to the server is kept alive between requests instead
+    of being reopened for each directory listing and data file.
+    
+    :return: The HTTP session of the calling thread.
+    :rtype: requests.Session
+    
+    '''
+    
+    session = getattr(SESSIONS, "session", None)
+    
+    if session is None:
+        
+        session          = requests.Session()
+        SESSIONS.session = session
+        
+        # Directory listings are compressible HTML, so they are requested
+        # compressed regardless of the defaults of `requests`.
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+        session.headers["User-Agent"]      = f"cosmic_crunch/{__version__}"
     
+    return session
+
 
 # %% Function definition: parallelize
 def parallelize(
         function  : Callable,
         domain    : Iterable,
         desc      : str  = None,
-        processes : int  = PROCESSES,
+        threads   : int  = CONNECTIONS,
         verbose   : bool = True,
         total     : int  = None) -> list:
     
@@ -137,8 +225,8 @@ def parallelize(
     :param domain: The domain to use as function arguments.
     :type domain: Iterable
     
-    :param processes: The number of pool processes to use for worker creation.
-    :type processes: int
+    :param threads: The number of worker threads to use.
+    :type threads: int
     
     :param desc: The description of the task being parallelized.
     :type desc: str
@@ -149,7 +237,8 @@ def parallelize(
     :param total: The total number of iterations expected.
     :type total: int
     
-    :return: A list of collected return values from the paralleized function.
+    :return: A list of collected return values from the paralleized function,
+             in the order in which they finish.
     :rtype: list
     
     '''
@@ -160,24 +249,29 @@ def parallelize(
         
         total = len(domain)
     
-    if processes > 1:
+    if threads > 1:
     
-        # Instantiates the multiprocessing pool.
-        with multiprocessing.Pool(processes) as pool:
+        pool = _get_pool(threads)
 
-            # Deterines whether or not to wrap the Pool.imap with a tqdm
-            # progress bar.
-            if verbose:
+        # Results are collected in the order in which they finish, so that
+        # one slow request neither holds back the progress bar nor the
+        # results behind it. Each request waits on the network for far
+        # longer than it takes to hand it to a thread, so the tasks are
+        # handed out one at a time to keep every thread busy until the end.
+        #
+        # Deterines whether or not to wrap the Pool.imap_unordered with a
+        # tqdm progress bar.
+        if verbose:
 
-                results = list(tqdm(
-                    pool.imap(function, domain),
-                    total = total,
-                    desc  = desc
-                ))
+            results = list(tqdm(
+                pool.imap_unordered(function, domain),
+                total = total,
+                desc  = desc
+            ))
 
-            else:
+        else:
 
-                results = list(pool.imap(function, domain))
+            results = list(pool.imap_unordered(function, domain))
                 
     else:
         
@@ -204,51 +298,171 @@ def retry_decorator(func : Callable) -> Callable:
     
     '''
     
-    # TODO
+    Wraps a function so that it is attempted up to `RETRIES` times when it
+    raises a `requests.RequestException`. Between attempts, the wrapper waits
+    a random time of up to 1, 2, 4, ... seconds, capped at `MAX_BACKOFF`, so
+    that failing requests back off rather than hammering the server. If the
+    final attempt fails, its exception is raised. Client errors other than
+    "429 Too Many Requests", such as a missing file, would fail again on
+    every attempt and are raised immediately.
+    
+    :param func: The function to wrap.
+    :type func: Callable
+    
+    :return: The wrapped function.
+    :rtype: Callable
     
     '''
     
     def wrapper(*args, **kwargs):
         
-        retry    = True
-        attempts = 0
-        
-        while retry:
-            
-            attempts += 1
+        for attempt in range(RETRIES):
             
             try:
         
-                value = func(*args, **kwargs)
-                retry = False
-                
-                return value
+                return func(*args, **kwargs)
         
-            except Exception:
+            except requests.RequestException as error:
+                
+                status = getattr(error.response, "status_code", None)
                 
-                pass
+                if attempt == RETRIES - 1 or (
+                    status is not None and 400 <= status < 500
+                    and status != 429
+                ):
+                    
+                    raise
+                
+                time.sleep(random.uniform(0, min(MAX_BACKOFF, 2 ** attempt)))
         
     return wrapper
                 
 
-# %% Function definition: _crawl_cosmic_urls
-def _crawl_cosmic_urls() -> List[str]:
+# %% Function definition: _get_hrefs
+def _get_hrefs(url : str, cache_ttl : float = CACHE_TTL) -> List[str]:
     
     '''
     
-    # TODO
+    Requests a directory listing and returns the target of each of its links,
+    in order. The listing is scanned once with `URL_REGEX`, and each crawling
+    stage then keeps the links which fully match its own, much shorter
+    pattern.
+    
+    The links of each listing are cached in `CACHE_DIRECTORY`. A listing is
+    only requested again once its cached links are older than the given time
+    to live, so that a repeated crawl makes few or no requests.
+    
+    :param url: The URL of the directory listing.
+    :type url: str
+    
+    :param cache_ttl: The time to live of cached links, in hours. A time to
+                      live of 0 disables the cache.
+    :type cache_ttl: float
+    
+    :return: The targets of the links in the directory listing.
+    :rtype: List[str]
     
     '''
+    
+    logger = logging.getLogger("_get_hrefs")
+    
+    cache_key  = hashlib.sha1(url.encode()).hexdigest()
+    cache_path = os.path.join(CACHE_DIRECTORY, cache_key)
+    
+    if cache_ttl > 0:
+        
+        try:
+            
+            age = time.time() - os.path.getmtime(cache_path)
+            
+            if age < cache_ttl * 3600:
+                
+                with open(cache_path) as file:
+                    
+                    return file.read().splitlines()
+            
+        except OSError:
+            
+            pass
+    
+    with _get_session().get(url, timeout = TIMEOUT) as request:
+        
+        request.raise_for_status()
+        
+        hrefs = URL_REGEX.findall(request.content.decode())
+    
+    # Listings are crawled concurrently, possibly by several processes, so
+    # each is written to a uniquely named temporary file first and then
+    # renamed, which never exposes a partial file. The cache only saves
+    # requests, so a listing which cannot be cached is still returned, and
+    # its temporary file, if any, is removed.
+    if cache_ttl > 0:
+        
+        temp_path = None
+        
+        try:
+            
+            os.makedirs(CACHE_DIRECTORY, exist_ok = True)
+            
+            with tempfile.NamedTemporaryFile(
+                    mode   = "w",
+                    dir    = CACHE_DIRECTORY,
+                    prefix = f"{cache_key}.",
+                    delete = False) as file:
+                
+                temp_path = file.name
+                
+                file.write("\n".join(hrefs))
+            
+            os.replace(temp_path, cache_path)
+            
+            temp_path = None
+            
+        except OSError as error:
+            
+            logger.warning(
+                f"The links of the following listing could not be cached: "
+                f"{url}. {error}"
+            )
+            
+        finally:
+            
+            if temp_path is not None:
+                
+                try:
+                    
+                    os.remove(temp_path)
+                    
+                except OSError:
+                    
+                    pass
+    
+    return hrefs
 
-    with requests.get(BASE_URL) as request:
 
-        request.raise_for_status()
+# %% Function definition: _crawl_cosmic_urls
+def _crawl_cosmic_urls(
+        instrument : str   = INSTRUMENT,
+        cache_ttl  : float = CACHE_TTL) -> List[str]:
+    
+    '''
+    
+    Crawls the site for the data directory of each mission.
+    
+    :param instrument: The name which the mission directories contain.
+    :type instrument: str
+    
+    :param cache_ttl: The time to live of cached listings, in hours.
+    :type cache_ttl: float
+    
+    :return: The URLs of the data directories.
+    :rtype: List[str]
+    
+    '''
 
-        content     = request.content.decode()
-        urls        = URL_REGEX.findall(content)
-        cosmic_urls = [u for u in urls if INSTRUMENT in u.lower()]
-        cosmic_urls = [BASE_URL + "/" + u for u in cosmic_urls]
-        cosmic_urls = [u + "/" + DATA_DIRECTORY for u in cosmic_urls]
+    urls        = _get_hrefs(BASE_URL, cache_ttl)
+    cosmic_urls = [u for u in urls if instrument in u.lower()]
+    cosmic_urls = [f"{BASE_URL}/{u}/{DATA_DIRECTORY}" for u in cosmic_urls]
     
     return cosmic_urls
 
@@ -268,21 +482,32 @@ def crawl_cosmic_urls(*args : List, **kwargs : Dict) -> Callable:
 
 
 # %% Function definition: _crawl_year_urls
-def _crawl_year_urls(cosmic_url : str) -> List[str]:
+def _crawl_year_urls(
+        cosmic_url : str,
+        year_regex : re.Pattern = YEAR_URL_REGEX,
+        cache_ttl  : float      = CACHE_TTL) -> List[str]:
     
     '''
-        
-    # TODO
+    
+    Crawls a data directory for its year directories.
+    
+    :param cosmic_url: The URL of the data directory.
+    :type cosmic_url: str
+    
+    :param year_regex: The pattern which the year directories fully match.
+    :type year_regex: re.Pattern
+    
+    :param cache_ttl: The time to live of cached listings, in hours.
+    :type cache_ttl: float
+    
+    :return: The URLs of the year directories.
+    :rtype: List[str]
     
     '''
              
-    with requests.get(cosmic_url) as request:
-
-        request.raise_for_status()
-
-        content   = request.content.decode()
-        year_urls = YEAR_URL_REGEX.findall(content)
-        year_urls = [cosmic_url + "/" + year for year in year_urls]
+    year_urls = _get_hrefs(cosmic_url, cache_ttl)
+    year_urls = [u for u in year_urls if year_regex.fullmatch(u)]
+    year_urls = [f"{cosmic_url}/{year}" for year in year_urls]
 
     return year_urls
 
@@ -302,21 +527,32 @@ def crawl_year_urls(*args : List, **kwargs : Dict):
 
 
 # %% Function definition: _crawl_date_urls
-def _crawl_date_urls(year_url : str) -> List[str]:
+def _crawl_date_urls(
+        year_url   : str,
+        date_regex : re.Pattern = DATE_URL_REGEX,
+        cache_ttl  : float      = CACHE_TTL) -> List[str]:
     
     '''
-        
-    # TODO
+    
+    Crawls a year directory for its date directories.
+    
+    :param year_url: The URL of the year directory.
+    :type year_url: str
+    
+    :param date_regex: The pattern which the date directories fully match.
+    :type date_regex: re.Pattern
+    
+    :param cache_ttl: The time to live of cached listings, in hours.
+    :type cache_ttl: float
+    
+    :return: The URLs of the date directories.
+    :rtype: List[str]
     
     '''
     
-    with requests.get(year_url) as request:
-
-        request.raise_for_status()
-
-        content   = request.content.decode()
-        date_urls = DATE_URL_REGEX.findall(content)
-        date_urls = [year_url + "/" + date for date in date_urls]
+    date_urls = _get_hrefs(year_url, cache_ttl)
+    date_urls = [u for u in date_urls if date_regex.fullmatch(u)]
+    date_urls = [f"{year_url}/{date}" for date in date_urls]
 
     return date_urls
 
@@ -336,32 +572,37 @@ def crawl_date_urls(*args : List, **kwargs : Dict) -> Callable:
           
 
 # %% Function definition: _crawl_format_urls
-def _crawl_format_urls(date_url : str) -> List[str]:
+def _crawl_format_urls(
+        date_url  : str,
+        cache_ttl : float = CACHE_TTL) -> List[str]:
     
     '''
-        
-    # TODO
+    
+    Crawls a date directory for its format directories.
+    
+    :param date_url: The URL of the date directory.
+    :type date_url: str
+    
+    :param cache_ttl: The time to live of cached listings, in hours.
+    :type cache_ttl: float
+    
+    :return: The URLs of the format directories.
+    :rtype: List[str]
     
     '''
     
-    with requests.get(date_url) as request:
-
-        request.raise_for_status()
-
-        content = request.content.decode()
-        urls    = URL_REGEX.findall(content)
-
-        if len([url for url in urls if DATA_LEVEL in url]) > 0:
+    format_urls = _get_hrefs(date_url, cache_ttl)
 
-            date_url += "/" + DATA_LEVEL
+    # The format directories are either listed in the date directory itself
+    # or nested in its data level directory, which then needs a listing of
+    # its own.
+    if len([url for url in format_urls if DATA_LEVEL in url]) > 0:
 
-    with requests.get(date_url) as request:
+        date_url     = f"{date_url}/{DATA_LEVEL}"
+        format_urls  = _get_hrefs(date_url, cache_ttl)
 
-        request.raise_for_status()
-
-        content    = request.content.decode()
-        format_urls = FORMAT_URL_REGEX.findall(content)
-        format_urls = [date_url + "/" + url for url in format_urls]
+    format_urls = [u for u in format_urls if FORMAT_URL_REGEX.fullmatch(u)]
+    format_urls = [f"{date_url}/{url}" for url in format_urls]
                         
     return format_urls
 
@@ -381,21 +622,28 @@ def crawl_format_urls(*args : List, **kwargs : Dict) -> Callable:
     
 
 # %% Function definition: _crawl_data_urls
-def _crawl_data_urls(format_url : str) -> List[str]:
+def _crawl_data_urls(
+        format_url : str,
+        cache_ttl  : float = CACHE_TTL) -> List[str]:
     
     '''
-        
-    # TODO
+    
+    Crawls a format directory for its data files.
+    
+    :param format_url: The URL of the format directory.
+    :type format_url: str
+    
+    :param cache_ttl: The time to live of cached listings, in hours.
+    :type cache_ttl: float
+    
+    :return: The URLs of the data files.
+    :rtype: List[str]
     
     '''
         
-    with requests.get(format_url) as request:
-
-        request.raise_for_status()
-
-        site_data = request.content.decode()
-        filenames = DATA_URL_REGEX.findall(site_data)
-        data_urls = [format_url + "/" + name for name in filenames]
+    filenames = _get_hrefs(format_url, cache_ttl)
+    filenames = [u for u in filenames if DATA_URL_REGEX.fullmatch(u)]
+    data_urls = [f"{format_url}/{name}" for name in filenames]
 
     return data_urls
 
@@ -414,89 +662,389 @@ def crawl_data_urls(*args : List, **kwargs : Dict) -> Callable:
     return retry_decorator(_crawl_data_urls)(*args, **kwargs)
 
 
+# %% Function definition: _get_dst_path
+def _get_dst_path(source_url : str) -> str:
+    
+    '''
+    
+    Returns the path to which a data file is downloaded, which is of the form
+    "<SAVE_DIRECTORY>/<year>/<date>/<format>/<filename>".
+    
+    :param source_url: The URL of the data file.
+    :type source_url: str
+    
+    :return: The path to which the data file is downloaded.
+    :rtype: str
+    
+    :raises ValueError: If the URL is not of the form of a data file URL.
+    
+    '''
+    
+    # Data file URLs have the known form
+    # ".../cosmic<#>/postproc/y<year>/<date>/[L2/]<format>/<filename>", so
+    # they are split on their separators rather than matched. Empty parts
+    # from repeated separators are dropped.
+    parts = [part for part in source_url.split("/") if part]
+    
+    if len(parts) >= 3 and parts[-3] == DATA_LEVEL:
+        
+        del parts[-3]
+    
+    if len(parts) < 4:
+        
+        raise ValueError(f"Not a data file URL: {source_url}")
+    
+    year, dtg, filetype, filename = parts[-4:]
+    
+    # The year and date directories are validated with the same patterns by
+    # which they are crawled, which include their trailing separators.
+    if not (YEAR_URL_REGEX.fullmatch(f"{year}/")
+            and DATE_URL_REGEX.fullmatch(f"{dtg}/")):
+        
+        raise ValueError(f"Not a data file URL: {source_url}")
+    
+    year = year[1:]
+    
+    return os.path.join(SAVE_DIRECTORY, year, dtg, filetype, filename)
+
+
 # %% Function definition: _download_data_file
-def _download_data_file(source_url : str) -> None:
+def _download_data_file(source_url : str) -> bool:
     
     '''
         
-    # TODO
+    Downloads a data file. Its directory must already exist, as the
+    directories of all data files are created before they are downloaded.
+    
+    :param source_url: The URL of the data file.
+    :type source_url: str
+    
+    :return: Whether the file was downloaded, rather than already complete.
+    :rtype: bool
     
     '''
     
-    metadata = FILENAME_REGEX.match(source_url)
-
-    year     = metadata["year"]
-    dtg      = metadata["dtg"]
-    filetype = metadata["filetype"]
-    filename = metadata["filename"]
+    dst_path       = _get_dst_path(source_url)
+    part_path      = dst_path + PART_SUFFIX
+    validator_path = dst_path + VALIDATOR_SUFFIX
+    session        = _get_session()
     
-    dst_directory = os.path.join(SAVE_DIRECTORY, year)
-    dst_directory = os.path.join(dst_directory,  dtg)
-    dst_directory = os.path.join(dst_directory,  filetype)
+    # The data files are already compressed, and their sizes and byte
+    # ranges must refer to the file itself, so they are requested without
+    # any further encoding.
+    headers = {"Accept-Encoding" : "identity"}
     
-    if not os.path.exists(dst_directory):
+    # Files are downloaded under a temporary name and only renamed once
+    # they are complete, so an existing file is a complete download. It is
+    # only downloaded again if the size of the file on the server differs.
+    if os.path.exists(dst_path):
         
-        os.makedirs(dst_directory)
-    
-    dst_path = os.path.join(dst_directory, filename)
+        with session.head(
+            source_url,
+            headers         = headers,
+            allow_redirects = True,
+            timeout         = TIMEOUT,
+        ) as request:
+            
+            request.raise_for_status()
+            
+            size = request.headers.get("Content-Length")
+        
+        if size is not None and int(size) == os.path.getsize(dst_path):
+            
+            return False
     
-    with requests.get(source_url, stream = True) as request:
+    # A validator file is only present while a download is incomplete. If
+    # one exists, the download is resumed from the end of the partial file,
+    # provided that the file on the server has not changed since.
+    if os.path.exists(part_path) and os.path.exists(validator_path):
+        
+        with open(validator_path) as file:
+            
+            validator = file.read()
+        
+        headers["Range"]    = f"bytes={os.path.getsize(part_path)}-"
+        headers["If-Range"] = validator
+    
+    with session.get(
+        source_url,
+        headers = headers,
+        stream  = True,
+        timeout = TIMEOUT,
+    ) as request:
+        
+        # The partial file already held every byte of the file.
+        if request.status_code == 416:
+            
+            os.replace(part_path, dst_path)
+            os.remove(validator_path)
             
+            return True
+        
         request.raise_for_status()
+        
+        # Servers answer with the remainder of the file if it is unchanged and
+        # with the whole file otherwise.
+        resumed = request.status_code == 206
+        
+        if not resumed:
+            
+            validator = (
+                request.headers.get("ETag")
+                or request.headers.get("Last-Modified")
+            )
             
-        with open(dst_path, "wb") as file:
+            if validator is not None:
                 
-            for chunk in request.iter_content(chunk_size = CHUNK_SIZE):
+                with open(validator_path, "w") as file:
+                    
+                    file.write(validator)
+        
+        # The response is read in large chunks, so that the file is written
+        # with one read and one write per megabyte rather than per few
+        # kilobytes. Unlike reading the raw response directly, iterating over
+        # its content raises network errors as `requests` exceptions, which
+        # the download is retried on.
+        mode = "ab" if resumed else "wb"
+        
+        with open(part_path, mode) as file:
+                
+            for chunk in request.iter_content(chunk_size = BUFFER_SIZE):
                 
                 file.write(chunk)
+    
+    os.replace(part_path, dst_path)
+    
+    if os.path.exists(validator_path):
+        
+        os.remove(validator_path)
+    
+    return True
 
 
 # %% Function definition: download_data_file
-def download_data_file(*args : List, **kwargs : Dict) -> Callable:
+def download_data_file(source_url : str) -> int:
     
     '''
     
-    Pickleable with decorator.
+    Downloads a data file, retrying failed requests. If the download still
+    fails, the error is logged and reported through the completion code, so
+    that one missing or unreachable file does not stop the other downloads.
     
-    # TODO
+    :param source_url: The URL of the data file.
+    :type source_url: str
+    
+    :return: An integer completion code. 0: downloaded, 1: skipped, 2: error.
+    :rtype: int
     
     '''
     
-    return retry_decorator(_download_data_file)(*args, **kwargs)
+    logger = logging.getLogger("download_data_file")
+    
+    completion_codes = {
+        "downloaded" : 0,
+        "skipped"    : 1,
+        "error"      : 2,
+    }
+    
+    try:
+        
+        if retry_decorator(_download_data_file)(source_url):
+            
+            return completion_codes["downloaded"]
+        
+        return completion_codes["skipped"]
+        
+    except (requests.RequestException, OSError) as error:
+        
+        logger.error(
+            f"An error occurred while attempting to download {source_url}"
+        )
+        
+        logger.exception(error)
+        
+        return completion_codes["error"]
     
 
 # %% Function definition: crawl_site
-def crawl_site(processes : int = PROCESSES) -> List[str]:
+def crawl_site(
+        connections : int           = CONNECTIONS,
+        year_regex  : Optional[str] = None,
+        date_regex  : Optional[str] = None,
+        instrument  : str           = INSTRUMENT,
+        cache_ttl   : float         = CACHE_TTL) -> List[str]:
     
     '''
     
-    # TODO
+    Crawls the site for the URLs of every data file. Rather than waiting for
+    every listing of one level of the site before requesting the next level,
+    the links found in each listing are requested as soon as it finishes, so
+    that the connections are kept busy from the first listing to the last.
+    Listings which still fail after their retries are logged and skipped.
+    
+    :param connections: The number of concurrent connections to use.
+    :type connections: int
+    
+    :param year_regex: An optional regular expression which the years to
+                       crawl must fully match. Defaults to every year.
+    :type year_regex: Optional[str]
+    
+    :param date_regex: An optional regular expression which the dates to
+                       crawl must fully match. Defaults to every date.
+    :type date_regex: Optional[str]
+    
+    :param instrument: The name which the mission directories contain.
+    :type instrument: str
+    
+    :param cache_ttl: The time to live of cached listings, in hours. A time
+                      to live of 0 disables the cache.
+    :type cache_ttl: float
+    
+    :return: The sorted URLs of every data file.
+    :rtype: List[str]
     
     '''
     
-    cosmic_urls = crawl_cosmic_urls()
+    year_pattern = YEAR_URL_REGEX
+    date_pattern = DATE_URL_REGEX
     
-    year_desc = "Crawling all ./cosmic<#>/postproc"
-    year_urls = flatten(parallelize(
-        crawl_year_urls, cosmic_urls, year_desc, processes
-    ))
+    if year_regex is not None:
+        
+        year_pattern = re.compile("y" + year_regex + "/")
     
-    date_desc = "Crawling all ./cosmic<#>/.../<year>"
-    date_urls = flatten(parallelize(
-        crawl_date_urls, year_urls, date_desc, processes
-    ))
+    if date_regex is not None:
+        
+        date_pattern = re.compile(date_regex + "/")
+    
+    logger  = logging.getLogger("crawl_site")
+    pool    = _get_pool(max(1, connections))
+    stages  = (
+        partial(crawl_year_urls, year_regex = year_pattern),
+        partial(crawl_date_urls, date_regex = date_pattern),
+        crawl_format_urls,
+        crawl_data_urls,
+    )
+    stages  = tuple(partial(stage, cache_ttl = cache_ttl) for stage in stages)
+    results = queue.SimpleQueue()
+    pending = 0
     
-    format_desc = "Crawling all ./cosmic<#>/.../<date>"
-    format_urls = flatten(parallelize(
-        crawl_format_urls, date_urls, format_desc, processes
-    ))
+    seen      = set()
+    data_urls = []
+    failures  = 0
     
-    data_desc = "Crawling all ./cosmic<#>/.../L2/<format>"
-    data_urls = flatten(parallelize(
-        crawl_data_urls, format_urls, data_desc, processes
-    ))
+    def submit(stage : int, url : str) -> None:
+        
+        pool.apply_async(
+            stages[stage],
+            (url,),
+            callback       = lambda urls:  results.put((stage, url, urls)),
+            error_callback = lambda error: results.put((stage, url, error))
+        )
     
-    return data_urls
+    def log_failure(url : str, error : requests.RequestException) -> None:
+        
+        logger.error(
+            f"An error occurred while attempting to crawl {url}",
+            exc_info = error
+        )
+    
+    # A listing which still fails after its retries is logged and skipped,
+    # so that one unreachable directory does not stop the rest of the crawl.
+    try:
+        
+        cosmic_urls = crawl_cosmic_urls(instrument, cache_ttl)
+        
+    except requests.RequestException as error:
+        
+        log_failure(BASE_URL, error)
+        
+        cosmic_urls = []
+        failures   += 1
+    
+    for url in cosmic_urls:
+        
+        submit(0, url)
+        
+        pending += 1
+    
+    with tqdm(total = pending, desc = "Crawling the site") as pbar:
+        
+        while pending:
+            
+            stage, url, urls = results.get()
+            pending         -= 1
+            
+            if isinstance(urls, requests.RequestException):
+                
+                log_failure(url, urls)
+                
+                urls      = []
+                failures += 1
+                
+            elif isinstance(urls, BaseException):
+                
+                raise urls
+            
+            if stage == len(stages) - 1:
+                
+                data_urls.extend(urls)
+                
+            else:
+                
+                # A directory may be linked from more than one listing, but
+                # it is only crawled once.
+                urls = [u for u in dict.fromkeys(urls) if u not in seen]
+                
+                seen.update(urls)
+                
+                for next_url in urls:
+                    
+                    submit(stage + 1, next_url)
+                
+                pending    += len(urls)
+                pbar.total += len(urls)
+            
+            pbar.update()
+    
+    if failures:
+        
+        print(
+            f"Directory listings which could not be crawled: {failures}. "
+            f"The errors are logged in \"{LOG_FILENAME}\"."
+        )
+    
+    # The listings finish in no particular order, so the URLs are sorted to
+    # keep the order of the data files, and any subset of them, repeatable.
+    # Data files which would be saved to the same path, such as one file
+    # reachable by two URLs, are only downloaded from the first such URL,
+    # and each URL which is dropped is logged. Links which are not of the
+    # form of a data file URL are skipped.
+    dst_urls = {}
+    
+    for url in sorted(data_urls):
+        
+        try:
+            
+            dst_path = _get_dst_path(url)
+            
+        except ValueError as error:
+            
+            logger.warning(f"{error}. It is not downloaded.")
+            
+            continue
+        
+        if dst_path in dst_urls:
+            
+            logger.warning(
+                f"{url} is not downloaded, as it would be saved to the same "
+                f"path as {dst_urls[dst_path]}: {dst_path}"
+            )
+            
+            continue
+        
+        dst_urls[dst_path] = url
+    
+    return list(dst_urls.values())
     
 
 # %% Main-multiprocessing hybrid entry point.
@@ -531,11 +1079,38 @@ if __name__ in ["__main__", "__mp_main__"]:
     
     parser.add_argument(
         "--processes",
+        "--jobs",
+        dest    = "processes",
         type    = int,
         default = PROCESSES,
         help    = (
-            "The number of processes to use in the multiprocessing pool. "
-            f"Defaults to {PROCESSES}."
+            "The number of processes to use to convert the data files to "
+            "netCDF4. Defaults to the number of CPUs available to this "
+            "process."
+        )
+    )
+    
+    parser.add_argument(
+        "--connections",
+        dest    = "connections",
+        type    = int,
+        default = CONNECTIONS,
+        help    = (
+            "The number of concurrent connections to use to crawl the site "
+            f"and download the data files. Defaults to {CONNECTIONS}."
+        )
+    )
+    
+    parser.add_argument(
+        "--cache_ttl",
+        dest    = "cache_ttl",
+        type    = float,
+        default = CACHE_TTL,
+        metavar = "HOURS",
+        help    = (
+            "The number of hours for which directory listings are cached "
+            "between runs. A value of 0 disables the cache. Defaults to "
+            f"{CACHE_TTL}."
         )
     )
     
@@ -560,29 +1135,53 @@ if __name__ in ["__main__", "__mp_main__"]:
         help   = "Skips converting files whose arrays are all empty."
     )
     
+    parser.add_argument(
+        "--float32",
+        dest   = "float32",
+        action = "store_true",
+        help   = (
+            "Stores the converted data as single precision floats. This "
+            "halves the size of the netCDF4 files, but only preserves about "
+            "7 significant digits."
+        )
+    )
+    
+    parser.add_argument(
+        "--complevel",
+        dest    = "complevel",
+        type    = int,
+        choices = range(10),
+        default = COMPLEVEL,
+        metavar = "COMPLEVEL",
+        help    = (
+            "The zlib compression level (0-9) of the converted netCDF4 "
+            "files. A level of 0 stores the data uncompressed and "
+            "contiguously, which is fastest to write and read. Defaults to "
+            f"{COMPLEVEL}."
+        )
+    )
+    
     parser.set_defaults(test_run   = False)
     parser.set_defaults(to_netcdf4 = False)
     parser.set_defaults(skip_empty = False)
+    parser.set_defaults(float32    = False)
     
     argv   = parser.parse_args()
     kwargv = vars(argv)
     
-    year_regex = kwargv["year_regex"]
-    date_regex = kwargv["date_regex"]
-    processes  = kwargv["processes"]
-    test_run   = kwargv["test_run"]
-    to_nc4     = kwargv["to_netcdf4"]
-    skip_empty = kwargv["skip_empty"]
+    year_regex  = kwargv["year_regex"]
+    date_regex  = kwargv["date_regex"]
+    processes   = kwargv["processes"]
+    connections = kwargv["connections"]
+    cache_ttl   = kwargv["cache_ttl"]
+    test_run    = kwargv["test_run"]
+    to_nc4      = kwargv["to_netcdf4"]
+    skip_empty  = kwargv["skip_empty"]
+    float32     = kwargv["float32"]
+    complevel   = kwargv["complevel"]
     
-    if year_regex is not None:
-        
-        YEAR_URL_REGEX = r"<a href=\"(?P<url>y" + year_regex + r"/)\""
-        YEAR_URL_REGEX = re.compile(YEAR_URL_REGEX, re.MULTILINE)
-
-    if date_regex is not None:
-        
-        DATE_URL_REGEX = r"<a href=\"(?P<url>" + date_regex + r"/)\""
-        DATE_URL_REGEX = re.compile(DATE_URL_REGEX, re.MULTILINE)
+    instrument   = INSTRUMENT
+    files_to_get = None
     
     if test_run:
         
@@ -594,29 +1193,58 @@ if __name__ in ["__main__", "__mp_main__"]:
             
             date_regex = "2019-01-03"
         
-        YEAR_URL_REGEX = r"<a href=\"(?P<url>y" + year_regex + r"/)\""
-        DATE_URL_REGEX = r"<a href=\"(?P<url>" + date_regex + r"/)\""
-        YEAR_URL_REGEX = re.compile(YEAR_URL_REGEX, re.MULTILINE)
-        DATE_URL_REGEX = re.compile(DATE_URL_REGEX, re.MULTILINE)
-        INSTRUMENT     = "cosmic1"
-        FILES_TO_GET   = 10
+        instrument   = "cosmic1"
+        files_to_get = 10
 
 # %% Main entry point.
 # - Allows forking to start child processes.
 if __name__ == "__main__":
     
-    data_urls = crawl_site(processes)[:FILES_TO_GET]
+    data_urls = crawl_site(
+        connections,
+        year_regex,
+        date_regex,
+        instrument,
+        cache_ttl
+    )
+    data_urls = data_urls[:files_to_get]
+    
+    # Many data files share a directory, so each directory is created once
+    # here rather than checked for by every download.
+    for directory in {os.path.dirname(_get_dst_path(u)) for u in data_urls}:
+        
+        os.makedirs(directory, exist_ok = True)
     
-    parallelize(
+    completion_codes = parallelize(
         download_data_file,
         data_urls,
         "Downloading data files",
-        processes
+        connections
     )
     
+    print(f"\nDownload summary:")
+    print(f" - Successful downloads:   {completion_codes.count(0)}")
+    print(f" - Skipped downloads:      {completion_codes.count(1)}")
+    print(f" - Download errors:        {completion_codes.count(2)}")
+    print(f" - Total number of files:  {len(completion_codes)}")
+    
+    if completion_codes.count(2):
+        
+        print(f"Download errors are logged in \"{LOG_FILENAME}\".")
+    
+    # The crawl and download threads are no longer needed, and the
+    # conversion forks worker processes.
+    _close_pools()
+    
     if to_nc4:
         
-        conversion_args  = ([SAVE_DIRECTORY], processes, skip_empty)
+        conversion_args  = (
+            [SAVE_DIRECTORY],
+            processes,
+            skip_empty,
+            float32,
+            complevel,
+        )
         completion_codes = crawl_convert(*conversion_args)
     
         total_conversions      = len(completion_codes)